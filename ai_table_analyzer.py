@@ -5,22 +5,272 @@ Uses Claude Sonnet 4.5 to intelligently analyze financial tables.
 
 Hybrid Approach:
 1. Primary: tables.html (clean structure, ~500 tokens per table)
-2. Secondary: _full.md (context for critical tables, ~1000 tokens)
+2. Secondary: _full.md (context for critical tables)
 
-Cost: ~$0.04 per PDF (12,500 tokens average)
+Cost: each critical table sends a ~50-line _full.md snippet (~1000 tokens).
+The whole document is sent as a prompt-cached block instead only when that is
+cheaper for the PDF (see HybridTableAnalyzer._full_doc_pays_off).
 """
 
 from pathlib import Path
-from typing import List, Dict, Optional
+from typing import List, Dict, Optional, Tuple
+import asyncio
+import bisect
+import hashlib
 import json
 import os
+import re
+import weakref
+from functools import cached_property
+import httpx
+import orjson
 from bs4 import BeautifulSoup
-from anthropic import Anthropic
+from diskcache import Cache
+from anthropic import AsyncAnthropic, DefaultAsyncHttpxClient
 from dotenv import load_dotenv
 
 # Load environment variables
 load_dotenv()
 
+MODEL = "claude-sonnet-4-5-20250929"
+
+# Tables of one PDF are analyzed back-to-back, so a 1h TTL keeps both the
+# instructions and the full document warm for the whole run.
+CACHE_CONTROL = {"type": "ephemeral", "ttl": "1h"}
+
+# Largest line-numbered _full.md ever sent whole as a cached system block. Thai
+# text can run close to one token per character, so this keeps the document
+# well inside the model's 200k-token context.
+FULL_DOC_MAX_CHARS = 120_000
+
+# Prompt cache pricing relative to base input tokens (1h TTL)
+CACHE_WRITE_COST = 2.0
+CACHE_READ_COST = 0.1
+
+# Upper bound on in-flight Claude requests per analyzer (rate-limit friendly)
+MAX_CONCURRENT_REQUESTS = 8
+
+# Tables packed into one basic-analysis request
+BATCH_SIZE = 6
+
+# Message Batches API polling (exponential backoff, seconds)
+BATCH_POLL_INITIAL = 5.0
+BATCH_POLL_MAX = 60.0
+
+# On-disk cache of analysis results, keyed by a hash of model + prompt +
+# table HTML, so identical tables across PDFs skip the Claude call
+RESULT_CACHE_DIR = "./.cache/table_analyzer"
+RESULT_CACHE_TTL = 86400 * 30
+
+# Thai Buddhist (2564-2567) and international (202x) year tokens
+YEAR_RE = re.compile(r'\b(2567|2566|2565|2564|202[0-9])\b')
+
+# "Table 7 (Page 0)" -> 7
+TABLE_NUM_RE = re.compile(r'Table (\d+)')
+
+# Line starting with a table number, e.g. "7 ที่ดิน อาคารและอุปกรณ์"
+NUM_PREFIX_RE = re.compile(r'\s*(\d+) ')
+
+# How far above a <table> tag a year may sit to count as that table's year
+YEAR_LOOKBACK_LINES = 15
+
+# One client (and connection pool) per event loop and API key, shared by every
+# analyzer instance so per-PDF analyzers reuse warm keep-alive connections.
+# Keyed by loop because pooled connections are bound to the loop that opened
+# them; analyze_directory runs a fresh asyncio.run per call.
+_CLIENT_CACHE: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, Dict[str, AsyncAnthropic]]" = (
+    weakref.WeakKeyDictionary()
+)
+
+
+def _require_api_key() -> str:
+    """Read the Claude API key from the environment."""
+    api_key = os.getenv("Claude_API_KEY")
+    if not api_key:
+        raise ValueError("Claude_API_KEY not found in .env file")
+    return api_key
+
+
+def _get_client(api_key: str) -> AsyncAnthropic:
+    """
+    Return the running event loop's shared Claude client for an API key,
+    creating it on first use. Must be called from a coroutine.
+    """
+    clients = _CLIENT_CACHE.setdefault(asyncio.get_running_loop(), {})
+    client = clients.get(api_key)
+    if client is None:
+        http_client = DefaultAsyncHttpxClient(
+            limits=httpx.Limits(
+                max_keepalive_connections=20,
+                max_connections=100,
+                keepalive_expiry=30.0
+            )
+        )
+        client = AsyncAnthropic(api_key=api_key, http_client=http_client)
+        clients[api_key] = client
+    return client
+
+
+_RESULT_CACHE: Optional[Cache] = None
+
+
+def _get_result_cache() -> Cache:
+    """Return the shared on-disk result cache, opening it on first use."""
+    global _RESULT_CACHE
+    if _RESULT_CACHE is None:
+        _RESULT_CACHE = Cache(RESULT_CACHE_DIR)
+    return _RESULT_CACHE
+
+
+def _result_cache_key(*parts: str) -> str:
+    """sha256 over the model id and every prompt part that shapes the result."""
+    digest = hashlib.sha256(MODEL.encode('utf-8'))
+    for part in parts:
+        digest.update(b'\0')
+        digest.update(part.encode('utf-8'))
+    return digest.hexdigest()
+
+
+# Shared classification hints (Thai + English financial terminology).
+# Kept verbose on purpose: the system blocks below are prompt-cached, and
+# Anthropic only caches prefixes above the model's 1024-token minimum.
+CLASSIFICATION_HINTS = """Classification hints:
+- balance_sheet: สินทรัพย์, หนี้สิน, ส่วนของผู้ถือหุ้น, สินทรัพย์หมุนเวียน, หนี้สินหมุนเวียน,
+  เงินสดและรายการเทียบเท่าเงินสด, ลูกหนี้การค้า, สินค้าคงเหลือ, เจ้าหนี้การค้า, เงินกู้ยืม,
+  Assets, Liabilities, Current Assets, Non-current Assets, Total Liabilities and Equity,
+  Statement of Financial Position
+- profit_loss: รายได้, รายจ่าย, กำไร, ขาดทุน, รายได้จากการขาย, ต้นทุนขาย, กำไรขั้นต้น,
+  ค่าใช้จ่ายในการขายและบริหาร, ต้นทุนทางการเงิน, ภาษีเงินได้, กำไร(ขาดทุน)สุทธิ,
+  Revenue, Sales, Cost of Sales, Gross Profit, Expense, Operating Profit, EBIT, Finance Costs,
+  Income Tax, Net Profit, Statement of Comprehensive Income, Income Statement
+- fixed_assets: ที่ดิน อาคาร อุปกรณ์, ที่ดิน อาคารและอุปกรณ์, ยานพาหนะ, เครื่องตกแต่ง,
+  ค่าเสื่อมราคา, ค่าเสื่อมราคาสะสม, ราคาทุน, มูลค่าสุทธิตามบัญชี,
+  Property Plant and Equipment, PP&E, Cost, Accumulated Depreciation, Depreciation, Net Book Value
+- equity: ทุนเรือนหุ้น, ทุนจดทะเบียน, ทุนที่ออกและชำระแล้ว, กำไรสะสม, สำรองตามกฎหมาย,
+  Share Capital, Issued and Paid-up Capital, Legal Reserve, Retained Earnings,
+  Statement of Changes in Equity
+- cash_flow: เงินสด, กระแสเงินสดจากกิจกรรมดำเนินงาน, กิจกรรมลงทุน, กิจกรรมจัดหาเงิน,
+  Cash Flow, Operating Activities, Investing Activities, Financing Activities
+- notes: หมายเหตุประกอบงบการเงิน, นโยบายการบัญชี, Notes to Financial Statements,
+  Accounting Policies, breakdowns or schedules supporting a main statement
+- other: anything that does not clearly fit the categories above (signatures, auditor
+  details, company information, tables of contents)
+
+Language and year guidance:
+- Documents may be Thai (Thai Buddhist Era years such as 2567, 2566, 2565) or
+  international (Gregorian years such as 2024, 2023, 2022)
+- Headers often carry both the current and prior year columns; prefer the most
+  recent year unless context clearly says otherwise
+- Amounts may use thousand separators and parentheses for negatives, e.g. (1,234.56)
+- Keep header and line item names in the ORIGINAL language of the document
+"""
+
+SYSTEM_CLASSIFY = f"""You analyze financial statement tables (may be Thai or international format).
+The user sends one or more tables, each with its number, title and HTML.
+Classify each table and extract key information.
+
+Record the result with the record_table tool. When several tables are sent, use the
+record_tables tool with one entry per table, in the same order. Each entry has this shape:
+{{
+  "table_number": <table number given by the user>,
+  "table_type": "balance_sheet" | "profit_loss" | "fixed_assets" | "notes" | "cash_flow" | "equity" | "other",
+  "contains_depreciation": true or false,
+  "key_headers": ["header1", "header2"],
+  "confidence": "high" | "medium" | "low"
+}}
+
+{CLASSIFICATION_HINTS}"""
+
+# Structured output: every request forces a tool call whose input_schema
+# matches the result dict, so replies never need text parsing.
+TABLE_TYPES = ["balance_sheet", "profit_loss", "fixed_assets", "notes", "cash_flow", "equity", "other"]
+
+BASIC_RESULT_SCHEMA = {
+    "type": "object",
+    "properties": {
+        "table_number": {"type": "integer"},
+        "table_type": {"type": "string", "enum": TABLE_TYPES},
+        "contains_depreciation": {"type": "boolean"},
+        "key_headers": {"type": "array", "items": {"type": "string"}},
+        "confidence": {"type": "string", "enum": ["high", "medium", "low"]}
+    },
+    "required": ["table_number", "table_type", "contains_depreciation", "key_headers", "confidence"]
+}
+
+CONTEXT_RESULT_SCHEMA = {
+    "type": "object",
+    "properties": {
+        "table_number": {"type": "integer"},
+        "year": {"type": ["string", "null"]},
+        "table_type": {"type": "string", "enum": TABLE_TYPES},
+        "contains_depreciation": {"type": "boolean"},
+        "depreciation_amount": {"type": ["number", "null"]},
+        "ebit_amount": {"type": ["number", "null"]},
+        "key_line_items": {"type": "object", "additionalProperties": {"type": "number"}},
+        "confidence": {"type": "string", "enum": ["high", "medium", "low"]}
+    },
+    "required": ["table_number", "year", "table_type", "contains_depreciation", "confidence"]
+}
+
+# Both classify tools are always sent (only tool_choice differs) so single
+# and batched requests share one cached tools + system prefix.
+CLASSIFY_TOOLS = [
+    {
+        "name": "record_table",
+        "description": "Record the classification of one financial table.",
+        "input_schema": BASIC_RESULT_SCHEMA
+    },
+    {
+        "name": "record_tables",
+        "description": "Record the classifications of several financial tables, in the order given.",
+        "input_schema": {
+            "type": "object",
+            "properties": {"tables": {"type": "array", "items": BASIC_RESULT_SCHEMA}},
+            "required": ["tables"]
+        }
+    }
+]
+
+CONTEXT_TOOLS = [
+    {
+        "name": "record_table_context",
+        "description": "Record the detailed analysis of one financial table, including its year.",
+        "input_schema": CONTEXT_RESULT_SCHEMA
+    }
+]
+
+SYSTEM_WITH_CONTEXT = f"""You analyze financial tables with context (may be Thai or international format).
+The source document is given as numbered lines, one per source line (may contain Thai
+Buddhist years like 2567, 2566 OR international years like 2023, 2024). Usually the user
+message includes just the document lines around the table; sometimes the full document
+follows these instructions instead and the user names the line range to focus on. The user
+sends one table: its title, that context, and the table HTML. Extract detailed information including year.
+
+Record the result with the record_table_context tool, in this shape:
+{{
+  "table_number": <table number given by the user>,
+  "year": "2567" or "2023" or "2024" or null (extract from context - can be Thai Buddhist year OR international year),
+  "table_type": "balance_sheet" | "profit_loss" | "fixed_assets" | "notes" | "other",
+  "contains_depreciation": true or false,
+  "depreciation_amount": number or null (total ค่าเสื่อมราคา if present),
+  "ebit_amount": number or null,
+  "key_line_items": {{
+    "item_name_in_original_language": amount,
+    "example": 6704482.16
+  }},
+  "confidence": "high"
+}}
+
+Important:
+- Look for year in context (can be Thai Buddhist like 2567, 2566 OR international like 2023, 2024, 2022)
+- Extract the ACTUAL year from the document, don't convert between formats
+- Keep line item names in ORIGINAL language from document (Thai stays Thai, English stays English)
+- DO NOT translate line item names - use exact text from the financial statement
+- For fixed_assets tables, extract total depreciation (ค่าเสื่อมราคา or Depreciation)
+- Extract key financial amounts
+
+{CLASSIFICATION_HINTS}"""
+
 
 class HybridTableAnalyzer:
     """
@@ -40,8 +290,13 @@ class HybridTableAnalyzer:
         self.output_dir = Path(output_dir)
         self.tables_html_path = self.output_dir / "tables.html"
 
-        # Find _full.md file
-        full_md_files = list(self.output_dir.parent.glob("*_full.md"))
+        # Find _full.md file (one directory scan, no extra stat calls)
+        try:
+            with os.scandir(self.output_dir.parent) as entries:
+                full_md_files = [Path(e.path) for e in entries if e.name.endswith('_full.md')]
+        except FileNotFoundError:
+            full_md_files = []
+
         if full_md_files:
             self.full_md_path = full_md_files[0]
         else:
@@ -51,122 +306,387 @@ class HybridTableAnalyzer:
         # Load files
         self.tables_html = self._load_html()
         self.full_md = self._load_markdown() if self.full_md_path else ""
+        self._index_markdown()
 
-        # Initialize Claude client
-        api_key = os.getenv("Claude_API_KEY")
-        if not api_key:
-            raise ValueError("Claude_API_KEY not found in .env file")
-        self.client = Anthropic(api_key=api_key)
+        # Claude client is resolved per event loop (see client)
+        self._api_key = _require_api_key()
+
+        # Result cache statistics for this PDF
+        self._cache_hits = 0
+        self._cache_misses = 0
 
         print(f"✅ Initialized HybridTableAnalyzer")
         print(f"   Output dir: {self.output_dir}")
-        print(f"   Tables HTML: {self.tables_html_path.exists()}")
-        print(f"   Full MD: {self.full_md_path.exists() if self.full_md_path else False}")
+        print(f"   Tables HTML: {self.tables_html_path}")
+        print(f"   Full MD: {self.full_md_path}")
+
+    @property
+    def client(self) -> AsyncAnthropic:
+        """Shared Claude client for the running event loop."""
+        return _get_client(self._api_key)
 
     def _load_html(self) -> str:
         """Load tables.html file."""
-        if not self.tables_html_path.exists():
-            raise FileNotFoundError(f"tables.html not found at {self.tables_html_path}")
-
-        with open(self.tables_html_path, 'r', encoding='utf-8') as f:
-            return f.read()
+        try:
+            with open(self.tables_html_path, 'r', encoding='utf-8') as f:
+                return f.read()
+        except FileNotFoundError:
+            raise FileNotFoundError(f"tables.html not found at {self.tables_html_path}") from None
 
     def _load_markdown(self) -> str:
         """Load _full.md file."""
-        if not self.full_md_path or not self.full_md_path.exists():
+        if not self.full_md_path:
             return ""
 
         with open(self.full_md_path, 'r', encoding='utf-8') as f:
             return f.read()
 
-    def analyze_all_tables(self) -> List[Dict]:
+    def _index_markdown(self):
+        """
+        Build line indexes over _full.md once, so per-table context lookups
+        don't rescan the whole document.
+
+        - self._lines: document split into lines
+        - self._year_lines: sorted indices of lines containing a year token
+        - self._table_line_idx: indices of lines containing a <table> tag
+        - self._num_prefix_idx: table number -> indices of lines starting with "{n} "
+        """
+        self._lines = self.full_md.split('\n') if self.full_md else []
+        self._year_lines = []
+        self._table_line_idx = []
+        self._num_prefix_idx = {}
+
+        for i, line in enumerate(self._lines):
+            if YEAR_RE.search(line):
+                self._year_lines.append(i)
+            if '<table>' in line:
+                self._table_line_idx.append(i)
+            match = NUM_PREFIX_RE.match(line)
+            if match:
+                self._num_prefix_idx.setdefault(int(match.group(1)), []).append(i)
+
+    def _number_lines(self, lines: List[str], first: int = 1) -> str:
+        """Prefix each line with its number so prompts can reference line ranges."""
+        return '\n'.join(f"{i}: {line}" for i, line in enumerate(lines, first))
+
+    @cached_property
+    def full_md_numbered(self) -> str:
+        """Line-numbered _full.md, built only once a context call sends the whole document."""
+        return self._number_lines(self._lines)
+
+    def _full_doc_pays_off(self, context_ranges: List[Tuple[int, int]]) -> bool:
+        """
+        Whether sending the whole document as a cached block beats inline snippets.
+
+        With document size D, k context calls and snippet sizes s_i, the cached
+        document costs 2*D (one cache write) + 0.1*D*(k-1) (later reads), against
+        sum(s_i) for snippets. Sizes are counted in characters of the numbered text.
+        """
+        k = len(context_ranges)
+        if k < 2:
+            return False
+
+        doc_size = sum(len(line) + len(str(i)) + 3 for i, line in enumerate(self._lines, 1))
+        if doc_size > FULL_DOC_MAX_CHARS:
+            return False
+
+        snippet_size = sum(
+            len(line) + len(str(i)) + 3
+            for start, end in context_ranges
+            for i, line in enumerate(self._lines[start:end], start + 1)
+        )
+        full_doc_cost = CACHE_WRITE_COST * doc_size + CACHE_READ_COST * doc_size * (k - 1)
+        return full_doc_cost < snippet_size
+
+    async def analyze_all_tables(self) -> List[Dict]:
         """
         Analyze all tables using hybrid approach.
 
+        Basic analysis packs up to BATCH_SIZE tables into one Claude request,
+        and batches are dispatched concurrently (bounded by
+        MAX_CONCURRENT_REQUESTS) so the round-trips overlap. HTML parsing and
+        result cache I/O run in worker threads, so only the Claude calls
+        occupy the event loop.
+
         Returns:
-            List of analysis results, one per table
+            List of analysis results, one per table (in document order)
         """
         print("\n🤖 Starting AI table analysis...")
         print(f"   Output directory: {self.output_dir}")
-        results = []
 
+        items, total = await asyncio.to_thread(self._collect_tables)
+
+        # Tables seen before (in this or another PDF) skip the basic request
+        cached_items, cached_results, to_analyze = await asyncio.to_thread(self._split_cached, items)
+
+        sem = asyncio.Semaphore(MAX_CONCURRENT_REQUESTS)
+        groups = [to_analyze[i:i + BATCH_SIZE] for i in range(0, len(to_analyze), BATCH_SIZE)]
+        outcomes = await asyncio.gather(
+            *(self._process_batch(sem, group) for group in groups), return_exceptions=True
+        )
+
+        # Context analysis starts once every basic result is in, so the
+        # snippet-vs-full-document choice can see all the critical tables
+        basic_items, basic_results = cached_items, cached_results
+        for group, outcome in zip(groups, outcomes):
+            if isinstance(outcome, BaseException):
+                print(f"   ❌ ERROR processing tables {group[0]['idx']}-{group[-1]['idx']}: {outcome}")
+                continue
+            basic_items.extend(group)
+            basic_results.extend(outcome)
+
+        finished = await self._finish_tables(sem, basic_items, basic_results, total)
+        results_by_idx = {
+            item['idx']: result
+            for item, result in zip(basic_items, finished)
+            if result is not None
+        }
+
+        results = [results_by_idx[idx] for idx in sorted(results_by_idx)]
+
+        print(f"\n✅ Successfully analyzed {len(results)}/{total} tables")
+        print(f"   Result cache: {self._cache_hits} hits, {self._cache_misses} misses")
+        return results
+
+    def _collect_tables(self) -> Tuple[List[Dict], int]:
+        """
+        Parse tables.html into per-table work items.
+
+        Returns:
+            (items, total) where items are dicts with idx, table_title,
+            table_number and table_html, and total is the number of h2 titles
+        """
         try:
             # Parse HTML
             print(f"   Parsing HTML file: {self.tables_html_path}")
-            soup = BeautifulSoup(self.tables_html, 'html.parser')
-            h2_tags = soup.find_all('h2')
-            print(f"   Found {len(h2_tags)} tables in HTML")
+            soup = BeautifulSoup(self.tables_html, 'lxml')
+            titled_tables = self._pair_titles_with_tables(soup)
+            print(f"   Found {len(titled_tables)} tables in HTML")
 
         except Exception as e:
             print(f"   ❌ ERROR parsing HTML: {e}")
             import traceback
             traceback.print_exc()
-            return []
+            return [], 0
 
-        for idx, h2 in enumerate(h2_tags, 1):
-            try:
+        items = []
+        for idx, (table_title, table_elem) in enumerate(titled_tables, 1):
+            if not table_elem:
+                print(f"   ⚠️  WARNING: No <table> element found after '{table_title}', skipping")
+                continue
+
+            items.append({
+                'idx': idx,
+                'table_title': table_title,
                 # Extract table number from h2 (e.g., "Table 7 (Page 0)")
-                table_title = h2.get_text()
-                table_number = self._extract_table_number(table_title)
-
-                print(f"\n📊 [{idx}/{len(h2_tags)}] Processing {table_title} (table_number={table_number})...")
-
-                # Find the table element after this h2
-                table_elem = h2.find_next('table')
-                if not table_elem:
-                    print(f"   ⚠️  WARNING: No <table> element found after h2, skipping")
-                    continue
-
-                # Step 1: Quick HTML analysis
-                table_html = str(table_elem)
-                print(f"   Step 1: Running basic HTML analysis...")
-                basic_result = self._analyze_table_html(table_html, table_number, table_title)
-                print(f"   ✅ Basic analysis complete: type={basic_result.get('table_type')}")
-
-                # Step 2: Check if needs context
-                if self._needs_context(basic_result):
-                    print(f"   🔍 Critical table detected (type={basic_result.get('table_type')}), fetching context...")
-                    context = self._extract_context_from_md(table_number)
-
-                    if context:
-                        print(f"   Step 2: Running deep context analysis...")
-                        final_result = self._analyze_with_context(
-                            table_html, context, table_number, table_title
+                'table_number': self._extract_table_number(table_title),
+                'table_html': str(table_elem)
+            })
+
+        return items, len(titled_tables)
+
+    def _split_cached(self, items: List[Dict]) -> Tuple[List[Dict], List[Dict], List[Dict]]:
+        """
+        Look up each table's basic analysis in the result cache.
+
+        Returns:
+            (cached_items, cached_results, to_analyze)
+        """
+        cached_items, cached_results, to_analyze = [], [], []
+        for item in items:
+            cached = self._cache_lookup(
+                _result_cache_key(SYSTEM_CLASSIFY, item['table_html']), item['table_number']
+            )
+            if cached is None:
+                to_analyze.append(item)
+            else:
+                cached_items.append(item)
+                cached_results.append(cached)
+        return cached_items, cached_results, to_analyze
+
+    def _store_basic_results(self, items: List[Dict], basic_results: List[Dict]) -> None:
+        """Cache the successful basic analysis results for a group of tables."""
+        for item, basic_result in zip(items, basic_results):
+            self._cache_store(_result_cache_key(SYSTEM_CLASSIFY, item['table_html']), basic_result)
+
+    def _pair_titles_with_tables(self, soup: BeautifulSoup) -> List[Tuple[str, Optional[object]]]:
+        """
+        Pair every h2 title with the first <table> that follows it.
+
+        Single pass over h2/table tags in document order (walked backwards),
+        instead of one find_next('table') tree walk per h2.
+
+        Returns:
+            List of (table_title, table_elem or None) in document order
+        """
+        pairs = []
+        next_table = None
+        for tag in reversed(soup.find_all(['h2', 'table'])):
+            if tag.name == 'table':
+                next_table = tag
+            else:
+                pairs.append((tag.get_text(), next_table))
+        pairs.reverse()
+        return pairs
+
+    async def _process_batch(self, sem: asyncio.Semaphore, items: List[Dict]) -> List[Dict]:
+        """
+        Run basic analysis for a batch of tables.
+
+        Args:
+            sem: Semaphore bounding concurrent Claude requests
+            items: Table dicts (idx, table_title, table_number, table_html)
+
+        Returns:
+            One basic analysis result per item, in order
+        """
+        print(f"\n📊 Step 1: Running basic HTML analysis for tables "
+              f"{', '.join(str(item['table_number']) for item in items)}...")
+
+        basic_results = None
+        if len(items) > 1:
+            async with sem:
+                basic_results = await self._analyze_batch(items)
+
+        if basic_results is None:
+            async def analyze_single(item: Dict) -> Dict:
+                async with sem:
+                    return await self._analyze_table_html(
+                        item['table_html'], item['table_number'], item['table_title']
+                    )
+
+            basic_results = await asyncio.gather(*(analyze_single(item) for item in items))
+
+        await asyncio.to_thread(self._store_basic_results, items, basic_results)
+        return basic_results
+
+    async def _finish_tables(
+        self,
+        sem: asyncio.Semaphore,
+        items: List[Dict],
+        basic_results: List[Dict],
+        total: int
+    ) -> List[Optional[Dict]]:
+        """
+        Run the context step for each table given its basic analysis result.
+
+        Decides once per PDF whether context calls send inline snippets or the
+        whole cached document. In the latter case the first context call runs
+        alone, so the rest read its cache entry instead of each paying the write.
+        """
+        context_ranges, send_full_doc = await asyncio.to_thread(
+            self._plan_context, items, basic_results
+        )
+
+        jobs = list(zip(items, basic_results, context_ranges))
+        first = None
+        if send_full_doc:
+            print(f"   📄 Sending full document as cached context for "
+                  f"{sum(1 for r in context_ranges if r)} critical tables")
+            first = next(n for n, r in enumerate(context_ranges) if r)
+
+        results: List[Optional[Dict]] = [None] * len(jobs)
+        if first is not None:
+            results[first] = await self._process_one(sem, *jobs[first], total, send_full_doc)
+
+        rest = [n for n in range(len(jobs)) if n != first]
+        outcomes = await asyncio.gather(*(
+            self._process_one(sem, *jobs[n], total, send_full_doc) for n in rest
+        ))
+        for n, outcome in zip(rest, outcomes):
+            results[n] = outcome
+        return results
+
+    def _plan_context(
+        self,
+        items: List[Dict],
+        basic_results: List[Dict]
+    ) -> Tuple[List[Optional[Tuple[int, int]]], bool]:
+        """
+        Pick each table's context line range and whether to send the full document.
+
+        Returns:
+            (context_ranges, send_full_doc) with None for tables that need no context
+        """
+        context_ranges = [
+            self._extract_context_from_md(item['table_number'])
+            if self._needs_context(basic_result) else None
+            for item, basic_result in zip(items, basic_results)
+        ]
+        send_full_doc = self._full_doc_pays_off([r for r in context_ranges if r])
+        if send_full_doc:
+            # Build the numbered document here rather than on the event loop
+            self.full_md_numbered
+        return context_ranges, send_full_doc
+
+    async def _process_one(
+        self,
+        sem: asyncio.Semaphore,
+        item: Dict,
+        basic_result: Dict,
+        context_range: Optional[Tuple[int, int]],
+        total: int,
+        send_full_doc: bool = False
+    ) -> Optional[Dict]:
+        """
+        Finish the hybrid analysis for one table given its basic analysis.
+
+        Args:
+            sem: Semaphore bounding concurrent Claude requests
+            item: Table dict (idx, table_title, table_number, table_html)
+            basic_result: Result of the basic HTML analysis
+            context_range: Context line range in _full.md, if the table needs context
+            total: Total number of tables
+            send_full_doc: Send the whole cached document instead of the snippet
+
+        Returns:
+            Analysis result dict, or None if the table failed
+        """
+        idx = item['idx']
+        table_title = item['table_title']
+        table_number = item['table_number']
+
+        try:
+            print(f"\n📊 [{idx}/{total}] {table_title} (table_number={table_number}): "
+                  f"basic type={basic_result.get('table_type')}")
+
+            # Step 2: Check if needs context
+            if self._needs_context(basic_result):
+                print(f"   🔍 Critical table detected (type={basic_result.get('table_type')}), fetching context...")
+
+                if context_range:
+                    print(f"   Step 2: Running deep context analysis...")
+                    async with sem:
+                        final_result = await self._analyze_with_context(
+                            item['table_html'], context_range, table_number, table_title, send_full_doc
                         )
-                        print(f"   ✅ Context analysis complete")
-                    else:
-                        print(f"   ⚠️  No context found in markdown, using basic analysis")
-                        final_result = basic_result
+                    print(f"   ✅ Context analysis complete")
                 else:
-                    print(f"   ✅ Basic analysis sufficient for this table type")
+                    print(f"   ⚠️  No context found in markdown, using basic analysis")
                     final_result = basic_result
+            else:
+                print(f"   ✅ Basic analysis sufficient for this table type")
+                final_result = basic_result
 
-                # Add metadata
-                final_result['table_title'] = table_title
-                final_result['original_csv'] = f"table_{table_number}_*.csv"
-
-                results.append(final_result)
-                print(f"   💾 Table {table_number} added to results")
+            # Add metadata
+            final_result['table_title'] = table_title
+            final_result['original_csv'] = f"table_{table_number}_*.csv"
 
-            except Exception as e:
-                print(f"   ❌ ERROR processing table {idx}: {e}")
-                import traceback
-                traceback.print_exc()
-                # Continue with next table
-                continue
+            print(f"   💾 Table {table_number} added to results")
+            return final_result
 
-        print(f"\n✅ Successfully analyzed {len(results)}/{len(h2_tags)} tables")
-        return results
+        except Exception as e:
+            print(f"   ❌ ERROR processing table {idx}: {e}")
+            import traceback
+            traceback.print_exc()
+            return None
 
     def _extract_table_number(self, table_title: str) -> int:
         """Extract table number from title like 'Table 7 (Page 0)'."""
-        import re
-        match = re.search(r'Table (\d+)', table_title)
-        if match:
-            return int(match.group(1))
-        return 0
+        match = TABLE_NUM_RE.search(table_title)
+        return int(match.group(1)) if match else 0
 
-    def _analyze_table_html(self, table_html: str, table_num: int, table_title: str) -> Dict:
+    async def _analyze_table_html(self, table_html: str, table_num: int, table_title: str) -> Dict:
         """
         Quick analysis from HTML only (~500 tokens input).
 
@@ -178,61 +698,130 @@ class HybridTableAnalyzer:
         Returns:
             Analysis result dict
         """
-        prompt = f"""Analyze this financial statement table (may be Thai or international format).
-
-**Table**: {table_title}
+        try:
+            response = await self.client.messages.create(
+                **self._basic_request_params(table_html, table_num, table_title)
+            )
+            self._log_cache_usage(response)
 
-**HTML**:
-{table_html}
+            result = self._tool_input(response)
+            result['table_number'] = table_num
+            return result
 
-Classify the table and extract key information.
+        except Exception as e:
+            print(f"   ❌ Error in basic analysis: {e}")
+            return self._failed_basic_result(table_num, str(e))
+
+    def _basic_request_params(self, table_html: str, table_num: int, table_title: str) -> Dict:
+        """Build the Messages API parameters for the basic analysis of one table."""
+        return {
+            "model": MODEL,
+            "system": [{
+                "type": "text",
+                "text": SYSTEM_CLASSIFY,
+                "cache_control": CACHE_CONTROL
+            }],
+            "messages": [{
+                "role": "user",
+                "content": f"Table number: {table_num}\nTable: {table_title}\nHTML:\n{table_html}"
+            }],
+            "tools": CLASSIFY_TOOLS,
+            "tool_choice": {"type": "tool", "name": "record_table"},
+            "max_tokens": 1000
+        }
+
+    def _failed_basic_result(self, table_num: int, error: str) -> Dict:
+        """Placeholder basic result for a table whose analysis failed."""
+        return {
+            "table_number": table_num,
+            "table_type": "other",
+            "contains_depreciation": False,
+            "key_headers": [],
+            "confidence": "low",
+            "error": error
+        }
+
+    async def _analyze_batch(self, items: List[Dict]) -> Optional[List[Dict]]:
+        """
+        Basic analysis of several tables in a single request.
 
-Return ONLY valid JSON (no markdown, no explanation):
-{{
-  "table_number": {table_num},
-  "table_type": "balance_sheet" | "profit_loss" | "fixed_assets" | "notes" | "cash_flow" | "equity" | "other",
-  "contains_depreciation": true or false,
-  "key_headers": ["header1", "header2"],
-  "confidence": "high" | "medium" | "low"
-}}
+        Args:
+            items: Table dicts (table_title, table_number, table_html)
 
-Classification hints:
-- balance_sheet: สินทรัพย์, หนี้สิน, ส่วนของผู้ถือหุ้น, Assets, Liabilities
-- profit_loss: รายได้, รายจ่าย, กำไร, ขาดทุน, Revenue, Expense, EBIT
-- fixed_assets: ที่ดิน อาคาร อุปกรณ์, ค่าเสื่อมราคา, Depreciation
-- equity: ทุนเรือนหุ้น, กำไรสะสม, Retained Earnings
-- cash_flow: เงินสด, Cash Flow
-"""
+        Returns:
+            One analysis result per item (in order), or None if the reply
+            could not be matched to the items - the caller then falls back
+            to one request per table
+        """
+        sections = [
+            f"[Table {n}]\nTable number: {item['table_number']}\n"
+            f"Table: {item['table_title']}\nHTML:\n{item['table_html']}"
+            for n, item in enumerate(items, 1)
+        ]
+        user_content = (
+            f"Analyze these {len(items)} tables and record them in the same order:\n\n"
+            + "\n\n".join(sections)
+        )
 
         try:
-            response = self.client.messages.create(
-                model="claude-sonnet-4-5-20250929",
-                messages=[{"role": "user", "content": prompt}],
-                max_tokens=1000
+            response = await self.client.messages.create(
+                model=MODEL,
+                system=[{
+                    "type": "text",
+                    "text": SYSTEM_CLASSIFY,
+                    "cache_control": CACHE_CONTROL
+                }],
+                messages=[{"role": "user", "content": user_content}],
+                tools=CLASSIFY_TOOLS,
+                tool_choice={"type": "tool", "name": "record_tables"},
+                max_tokens=1000 * len(items)
             )
+            self._log_cache_usage(response)
 
-            # Extract JSON from response
-            content = response.content[0].text.strip()
-
-            # Remove markdown code blocks if present
-            if content.startswith('```'):
-                content = content.split('```')[1]
-                if content.startswith('json'):
-                    content = content[4:]
-                content = content.strip()
+            results = self._tool_input(response).get('tables')
+            if not isinstance(results, list) or len(results) != len(items):
+                raise ValueError(f"expected {len(items)} recorded tables")
 
-            return json.loads(content)
+            # The model may echo the positional [Table n] label; the number is ours to set
+            for item, result in zip(items, results):
+                result['table_number'] = item['table_number']
+            return results
 
         except Exception as e:
-            print(f"   ❌ Error in basic analysis: {e}")
-            return {
-                "table_number": table_num,
-                "table_type": "other",
-                "contains_depreciation": False,
-                "key_headers": [],
-                "confidence": "low",
-                "error": str(e)
-            }
+            print(f"   ⚠️  Batch analysis failed ({e}), falling back to per-table requests")
+            return None
+
+    def _tool_input(self, message) -> Dict:
+        """Return the input of the forced tool call in a model reply."""
+        for block in message.content:
+            if block.type == "tool_use":
+                return block.input
+        raise ValueError(f"no tool call in reply (stop_reason={message.stop_reason})")
+
+    def _cache_lookup(self, key: str, table_num: int) -> Optional[Dict]:
+        """Fetch a cached result, renumbered for this table, or None on a miss."""
+        result = _get_result_cache().get(key)
+        if result is None:
+            self._cache_misses += 1
+            return None
+
+        self._cache_hits += 1
+        result['table_number'] = table_num
+        return result
+
+    def _cache_store(self, key: str, result: Dict) -> None:
+        """Cache a successful result (failed analyses are retried next time)."""
+        if 'error' not in result:
+            _get_result_cache().set(key, result, expire=RESULT_CACHE_TTL)
+
+    def _log_cache_usage(self, response) -> None:
+        """Log prompt cache reads/writes so cache hits can be verified per table."""
+        usage = getattr(response, 'usage', None)
+        if usage is None:
+            return
+        cache_read = getattr(usage, 'cache_read_input_tokens', 0) or 0
+        cache_write = getattr(usage, 'cache_creation_input_tokens', 0) or 0
+        print(f"   🗄️  Prompt cache: read={cache_read} write={cache_write} input={usage.input_tokens}")
 
     def _needs_context(self, result: Dict) -> bool:
         """
@@ -249,9 +838,9 @@ Classification hints:
             result.get('contains_depreciation') == True
         )
 
-    def _extract_context_from_md(self, table_number: int) -> str:
+    def _extract_context_from_md(self, table_number: int) -> Optional[Tuple[int, int]]:
         """
-        Extract context snippet from _full.md around table.
+        Locate the context snippet in _full.md around table.
 
         For continued tables (like Table 8 which is continuation of Table 7),
         searches for the table by its position in the markdown.
@@ -260,139 +849,116 @@ Classification hints:
             table_number: Table number to find
 
         Returns:
-            Context snippet (~200-500 tokens)
+            (start, end) line range of the snippet (0-based, end exclusive),
+            or None if no context was found
         """
         if not self.full_md:
-            return ""
+            return None
 
-        lines = self.full_md.split('\n')
+        lines = self._lines
 
         # Strategy 1: Find by table number
-        for i, line in enumerate(lines):
-            # Look for patterns like "7 ที่ดิน อาคารและอุปกรณ์"
-            # IMPORTANT: Must be at START of line to avoid false matches (like "8" in IDs)
-            stripped_line = line.strip()
-            if (stripped_line.startswith(f"{table_number} ") or
-                stripped_line.startswith(f"{table_number}  ")):
-                # Extract context (15 lines before and after)
-                start = max(0, i - 15)
-                end = min(len(lines), i + 35)  # More lines after (includes table)
-
-                context_lines = lines[start:end]
-                context = '\n'.join(context_lines)
-
-                # Look for year in context
-                if any(year in context for year in ['2567', '2566', '2565', '2564']):
-                    return context
+        # Look for patterns like "7 ที่ดิน อาคารและอุปกรณ์"
+        # IMPORTANT: Must be at START of line to avoid false matches (like "8" in IDs)
+        for i in self._num_prefix_idx.get(table_number, []):
+            # Extract context (15 lines before and after)
+            start = max(0, i - 15)
+            end = min(len(lines), i + 35)  # More lines after (includes table)
+
+            # Look for year in context
+            pos = bisect.bisect_left(self._year_lines, start)
+            if pos < len(self._year_lines) and self._year_lines[pos] < end:
+                return start, end
 
         # Strategy 2: Find by table tag position (for continued tables like Table 8)
-        # Count <table> tags and get context around the Nth table
-        table_count = 0
-        for i, line in enumerate(lines):
-            if '<table>' in line:
-                table_count += 1
-                if table_count == table_number:
-                    # Found the Nth table (line index i)
-                    # IMPORTANT: Find year that is CLOSEST to the table
-                    # (to avoid picking up document year from page headers)
-
-                    # Search backwards from table, find the CLOSEST year
-                    closest_year_line = None
-                    for back_offset in range(1, 15):  # Check up to 15 lines back
-                        check_line_idx = i - back_offset
-                        if check_line_idx < 0:
-                            break
-
-                        check_line = lines[check_line_idx]
-                        # Check if this line contains a year (and ONLY a year, not in middle of sentence)
-                        if any(year in check_line for year in ['2567', '2566', '2565', '2564']):
-                            closest_year_line = check_line_idx
-                            break  # Found closest year, stop searching
-
-                    if closest_year_line is not None:
-                        # Extract context around the closest year
-                        start = max(0, closest_year_line - 10)
-                        end = min(len(lines), i + 5)  # Up to just before table
-
-                        context_lines = lines[start:end]
-                        context = '\n'.join(context_lines)
-                        return context
-
-        return ""
-
-    def _analyze_with_context(
+        # Get context around the Nth <table> tag
+        if 0 < table_number <= len(self._table_line_idx):
+            i = self._table_line_idx[table_number - 1]
+
+            # IMPORTANT: Find year that is CLOSEST to the table
+            # (to avoid picking up document year from page headers)
+            pos = bisect.bisect_left(self._year_lines, i) - 1
+            if pos >= 0 and i - self._year_lines[pos] < YEAR_LOOKBACK_LINES:
+                closest_year_line = self._year_lines[pos]
+
+                # Extract context around the closest year
+                start = max(0, closest_year_line - 10)
+                end = min(len(lines), i + 5)  # Up to just before table
+                return start, end
+
+        return None
+
+    async def _analyze_with_context(
         self,
         table_html: str,
-        context: str,
+        context_range: Tuple[int, int],
         table_num: int,
-        table_title: str
+        table_title: str,
+        send_full_doc: bool = False
     ) -> Dict:
         """
-        Detailed analysis with context from markdown (~1000 tokens input).
+        Detailed analysis with context from markdown.
+
+        The context line range is sent inline. With send_full_doc, the whole
+        document goes in a second cached system block instead and the user
+        message only names the line range to focus on.
 
         Args:
             table_html: HTML string of the table
-            context: Context snippet from markdown
+            context_range: (start, end) line range in _full.md to focus on
             table_num: Table number
             table_title: Table title
+            send_full_doc: Send the whole document as a cached system block
 
         Returns:
             Enhanced analysis result with year
         """
-        prompt = f"""Analyze this financial table with context (may be Thai or international format).
-
-**Table**: {table_title}
-
-**Context from document** (may contain Thai Buddhist years like 2567, 2566 OR international years like 2023, 2024):
-{context}
-
-**Table HTML**:
-{table_html}
-
-Extract detailed information including year.
-
-Return ONLY valid JSON (no markdown, no explanation):
-{{
-  "table_number": {table_num},
-  "year": "2567" or "2023" or "2024" or null (extract from context - can be Thai Buddhist year OR international year),
-  "table_type": "balance_sheet" | "profit_loss" | "fixed_assets" | "notes" | "other",
-  "contains_depreciation": true or false,
-  "depreciation_amount": number or null (total ค่าเสื่อมราคา if present),
-  "ebit_amount": number or null,
-  "key_line_items": {{
-    "item_name_in_original_language": amount,
-    "example": 6704482.16
-  }},
-  "confidence": "high"
-}}
-
-Important:
-- Look for year in context (can be Thai Buddhist like 2567, 2566 OR international like 2023, 2024, 2022)
-- Extract the ACTUAL year from the document, don't convert between formats
-- Keep line item names in ORIGINAL language from document (Thai stays Thai, English stays English)
-- DO NOT translate line item names - use exact text from the financial statement
-- For fixed_assets tables, extract total depreciation (ค่าเสื่อมราคา or Depreciation)
-- Extract key financial amounts
-"""
+        start, end = context_range
+        cache_key = _result_cache_key(
+            SYSTEM_WITH_CONTEXT, table_html, '\n'.join(self._lines[start:end])
+        )
+        cached = await asyncio.to_thread(self._cache_lookup, cache_key, table_num)
+        if cached is not None:
+            print(f"   ♻️  Using cached context analysis")
+            return cached
+
+        system = [{
+            "type": "text",
+            "text": SYSTEM_WITH_CONTEXT,
+            "cache_control": CACHE_CONTROL
+        }]
+        if send_full_doc:
+            system.append({
+                "type": "text",
+                "text": f"Document:\n{self.full_md_numbered}",
+                "cache_control": CACHE_CONTROL
+            })
+            context = f"Context: focus on lines {start + 1}..{end} of the document"
+        else:
+            snippet = self._number_lines(self._lines[start:end], start + 1)
+            context = f"Context (lines {start + 1}..{end} of the document):\n{snippet}"
 
         try:
-            response = self.client.messages.create(
-                model="claude-sonnet-4-5-20250929",
-                messages=[{"role": "user", "content": prompt}],
+            response = await self.client.messages.create(
+                model=MODEL,
+                system=system,
+                messages=[{
+                    "role": "user",
+                    "content": (
+                        f"Table number: {table_num}\nTable: {table_title}\n"
+                        f"{context}\n\n"
+                        f"HTML:\n{table_html}"
+                    )
+                }],
+                tools=CONTEXT_TOOLS,
+                tool_choice={"type": "tool", "name": "record_table_context"},
                 max_tokens=2000
             )
+            self._log_cache_usage(response)
 
-            # Extract JSON from response
-            content = response.content[0].text.strip()
-
-            # Remove markdown code blocks if present
-            if content.startswith('```'):
-                content = content.split('```')[1]
-                if content.startswith('json'):
-                    content = content[4:]
-                content = content.strip()
-
-            result = json.loads(content)
+            result = self._tool_input(response)
+            result['table_number'] = table_num
+            await asyncio.to_thread(self._cache_store, cache_key, result)
 
             print(f"   ✅ Year: {result.get('year', 'N/A')}, Type: {result.get('table_type')}")
 
@@ -431,8 +997,13 @@ Important:
             # Ensure directory exists
             output_path.parent.mkdir(parents=True, exist_ok=True)
 
-            with open(output_path, 'w', encoding='utf-8') as f:
-                json.dump(results, f, ensure_ascii=False, indent=2)
+            data = orjson.dumps(results, option=orjson.OPT_INDENT_2 | orjson.OPT_NON_STR_KEYS)
+
+            # Write to a temp file and rename, so a crash never leaves a partial file
+            tmp_path = output_path.with_suffix('.json.tmp')
+            with open(tmp_path, 'wb') as f:
+                f.write(data)
+            os.replace(tmp_path, output_path)
 
             # Verify file was written
             if output_path.exists():
@@ -470,19 +1041,192 @@ Important:
         print("\n" + "="*60)
 
 
-def analyze_directory(output_dir: str, save: bool = True) -> List[Dict]:
+def _batch_custom_id(pdf_index: int, table_idx: int) -> str:
+    """custom_id for one table request (Batches API allows only [a-zA-Z0-9_-])."""
+    return f"pdf{pdf_index}-t{table_idx}"
+
+
+def load_batch_manifest(batch_id: str, manifest_dir: str) -> List[str]:
+    """
+    Load the output directories submitted with a batch, in submission order.
+
+    Raises:
+        FileNotFoundError: If no manifest exists for batch_id
+    """
+    manifest_path = Path(manifest_dir) / f"{batch_id}.json"
+    with open(manifest_path, 'r', encoding='utf-8') as f:
+        return json.load(f)['output_dirs']
+
+
+def load_batch_results(batch_id: str, manifest_dir: str) -> Optional[List[Dict]]:
+    """
+    Per-PDF summary recorded by record_batch_results, or None if the batch
+    has not been collected yet.
+    """
+    manifest_path = Path(manifest_dir) / f"{batch_id}.json"
+    with open(manifest_path, 'r', encoding='utf-8') as f:
+        return json.load(f).get('results')
+
+
+def record_batch_results(batch_id: str, manifest_dir: str, results: List[Dict]) -> None:
+    """
+    Mark a batch as collected by storing its per-PDF summary in the manifest,
+    so later status checks answer from disk instead of collecting again.
+    """
+    manifest_path = Path(manifest_dir) / f"{batch_id}.json"
+    with open(manifest_path, 'r', encoding='utf-8') as f:
+        manifest = json.load(f)
+    manifest['results'] = results
+
+    # Write-then-rename so a crash never leaves a half-written manifest
+    tmp_path = manifest_path.with_suffix('.json.tmp')
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, ensure_ascii=False, indent=2)
+    os.replace(tmp_path, manifest_path)
+
+
+async def submit_batch(analyzers: List[HybridTableAnalyzer], manifest_dir: str) -> str:
+    """
+    Submit the basic analysis of every table of every PDF as one Message Batch.
+
+    Batches are processed in the background at ~50% of the real-time price.
+    A manifest (batch_id -> output dirs) is written to manifest_dir so the
+    results can be reassembled later with collect_batch.
+
+    Args:
+        analyzers: One analyzer per PDF output directory
+        manifest_dir: Directory to store the batch manifest in
+
+    Returns:
+        Batch ID
+    """
+    requests = []
+    for pdf_index, analyzer in enumerate(analyzers):
+        items, _ = await asyncio.to_thread(analyzer._collect_tables)
+        for item in items:
+            requests.append({
+                "custom_id": _batch_custom_id(pdf_index, item['idx']),
+                "params": analyzer._basic_request_params(
+                    item['table_html'], item['table_number'], item['table_title']
+                )
+            })
+
+    if not requests:
+        raise ValueError("No tables found to submit")
+
+    client = _get_client(_require_api_key())
+    batch = await client.messages.batches.create(requests=requests)
+
+    manifest_path = Path(manifest_dir) / f"{batch.id}.json"
+    manifest_path.parent.mkdir(parents=True, exist_ok=True)
+    with open(manifest_path, 'w', encoding='utf-8') as f:
+        json.dump({
+            "batch_id": batch.id,
+            "output_dirs": [str(analyzer.output_dir) for analyzer in analyzers]
+        }, f, ensure_ascii=False, indent=2)
+
+    print(f"📨 Submitted batch {batch.id} with {len(requests)} table requests")
+    return batch.id
+
+
+async def get_batch_status(batch_id: str):
+    """Retrieve the current state of a Message Batch."""
+    client = _get_client(_require_api_key())
+    return await client.messages.batches.retrieve(batch_id)
+
+
+async def wait_for_batch(batch_id: str):
+    """Poll a Message Batch with exponential backoff until it has ended."""
+    delay = BATCH_POLL_INITIAL
+    while True:
+        batch = await get_batch_status(batch_id)
+        if batch.processing_status == "ended":
+            return batch
+
+        print(f"   ⏳ Batch {batch_id}: {batch.processing_status}, checking again in {delay:.0f}s")
+        await asyncio.sleep(delay)
+        delay = min(delay * 2, BATCH_POLL_MAX)
+
+
+async def collect_batch(batch_id: str, analyzers: List[HybridTableAnalyzer]) -> Dict[str, List[Dict]]:
+    """
+    Reassemble the results of an ended batch and finish the hybrid analysis.
+
+    Basic results are matched back to tables by custom_id; critical tables
+    then get their context analysis through the real-time API.
+
+    Args:
+        batch_id: Batch ID returned by submit_batch
+        analyzers: Analyzers in the same order as submitted
+
+    Returns:
+        Dict mapping output directory to its analysis results
+    """
+    client = _get_client(_require_api_key())
+
+    replies = {}
+    async for entry in await client.messages.batches.results(batch_id):
+        if entry.result.type == "succeeded":
+            replies[entry.custom_id] = (entry.result.message, None)
+        else:
+            replies[entry.custom_id] = (None, f"batch request {entry.result.type}")
+
+    sem = asyncio.Semaphore(MAX_CONCURRENT_REQUESTS)
+    all_results = {}
+    for pdf_index, analyzer in enumerate(analyzers):
+        items, total = await asyncio.to_thread(analyzer._collect_tables)
+
+        basic_results = []
+        for item in items:
+            message, error = replies.get(
+                _batch_custom_id(pdf_index, item['idx']), (None, "missing from batch results")
+            )
+            try:
+                if error:
+                    raise RuntimeError(error)
+                result = analyzer._tool_input(message)
+                result['table_number'] = item['table_number']
+                basic_results.append(result)
+            except Exception as e:
+                print(f"   ❌ Error in basic analysis of table {item['table_number']}: {e}")
+                basic_results.append(analyzer._failed_basic_result(item['table_number'], str(e)))
+
+        # Same result cache as real-time analysis, so these tables are not re-sent later
+        await asyncio.to_thread(analyzer._store_basic_results, items, basic_results)
+
+        results = await analyzer._finish_tables(sem, items, basic_results, total)
+        all_results[str(analyzer.output_dir)] = [result for result in results if result is not None]
+
+    return all_results
+
+
+async def _analyze_via_batch(analyzer: HybridTableAnalyzer) -> List[Dict]:
+    """Submit, wait for and collect a single-PDF batch."""
+    manifest_dir = analyzer.output_dir.parent / "batches"
+    batch_id = await submit_batch([analyzer], str(manifest_dir))
+    await wait_for_batch(batch_id)
+    results = await collect_batch(batch_id, [analyzer])
+    return results[str(analyzer.output_dir)]
+
+
+def analyze_directory(output_dir: str, save: bool = True, batch: bool = False) -> List[Dict]:
     """
     Convenience function to analyze a directory.
 
     Args:
         output_dir: Path to output directory with tables.html
         save: Whether to save results to JSON
+        batch: Use the Message Batches API (cheaper, but asynchronous and
+               can take minutes to hours) instead of real-time requests
 
     Returns:
         List of analysis results
     """
     analyzer = HybridTableAnalyzer(output_dir)
-    results = analyzer.analyze_all_tables()
+    if batch:
+        results = asyncio.run(_analyze_via_batch(analyzer))
+    else:
+        results = asyncio.run(analyzer.analyze_all_tables())
 
     if save:
         analyzer.save_analysis(results)
@@ -496,16 +1240,17 @@ if __name__ == "__main__":
     import sys
 
     if len(sys.argv) < 2:
-        print("Usage: uv run python ai_table_analyzer.py <output_dir>")
+        print("Usage: uv run python ai_table_analyzer.py <output_dir> [--batch]")
         print("Example: uv run python ai_table_analyzer.py 'output/งบการเงิน 2567'")
         sys.exit(1)
 
     output_dir = sys.argv[1]
+    use_batch = "--batch" in sys.argv[2:]
 
     print(f"🚀 Starting Hybrid AI Table Analysis")
     print(f"📁 Output directory: {output_dir}")
 
-    results = analyze_directory(output_dir, save=True)
+    results = analyze_directory(output_dir, save=True, batch=use_batch)
 
     print(f"\n✅ Analysis complete!")
     print(f"📊 Analyzed {len(results)} tables")
@@ -1,22 +1,48 @@
-from fastapi import FastAPI, UploadFile, File, HTTPException
+from fastapi import FastAPI, Request, UploadFile, File, HTTPException
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse
 from pydantic import BaseModel
 from pathlib import Path
 import sys
-import json
+import orjson
 import tempfile
 import shutil
 import asyncio
+from collections import defaultdict
 from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache, partial
 
 # Add parent directory to path to import existing modules
 sys.path.append(str(Path(__file__).parent.parent.parent))
 
 from multi_pdf_extract import process_multiple_pdfs
-from ai_table_analyzer import HybridTableAnalyzer
+from ai_table_analyzer import (
+    HybridTableAnalyzer,
+    collect_batch,
+    get_batch_status,
+    load_batch_manifest,
+    load_batch_results,
+    record_batch_results,
+    submit_batch,
+)
 
 app = FastAPI(title="Financial Analysis API")
 
+# Where Message Batch manifests (batch_id -> output dirs) are kept
+BATCH_MANIFEST_DIR = Path("output") / "batches"
+
+# One lock per batch, so concurrent polls of an ended batch collect it only once
+BATCH_LOCKS = defaultdict(asyncio.Lock)
+
+# Uploads are streamed to disk in chunks; reject anything larger than this
+UPLOAD_CHUNK_SIZE = 1 << 20
+MAX_UPLOAD_BYTES = 200 * 1024 * 1024
+
+# Dedicated pool for blocking pipeline work (upload copies, ADE extraction),
+# so large uploads don't starve the default executor used by other endpoints.
+# AI analysis is async and runs on the event loop itself.
+EXECUTOR = ThreadPoolExecutor(max_workers=16, thread_name_prefix="pipeline")
+
 # CORS - allow React app to call this API
 app.add_middleware(
     CORSMiddleware,
@@ -26,51 +52,97 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+@app.on_event("shutdown")
+def shutdown_executor():
+    EXECUTOR.shutdown(wait=True)
+
+
+# Fail fast on oversize uploads before the body is read
+@app.middleware("http")
+async def limit_upload_size(request: Request, call_next):
+    content_length = request.headers.get("content-length")
+    if not content_length:
+        return await call_next(request)
+    try:
+        content_length = int(content_length)
+    except ValueError:
+        return JSONResponse(status_code=400, content={"detail": "Invalid Content-Length header"})
+    if content_length > MAX_UPLOAD_BYTES:
+        return JSONResponse(
+            status_code=413,
+            content={"detail": f"Upload exceeds {MAX_UPLOAD_BYTES // (1024 * 1024)} MB"}
+        )
+    return await call_next(request)
+
+
+def save_upload(src, dest: Path):
+    """Copy an uploaded file to disk in chunks so memory use stays constant"""
+    written = 0
+    with open(dest, 'wb') as out:
+        while chunk := src.read(UPLOAD_CHUNK_SIZE):
+            written += len(chunk)
+            if written > MAX_UPLOAD_BYTES:
+                raise HTTPException(status_code=413, detail=f"{dest.name} is too large")
+            out.write(chunk)
+
 # ============================================
 # ENDPOINT 1: PDF Extraction
 # ============================================
 @app.post("/api/extract-pdf")
-async def extract_pdf(files: list[UploadFile] = File(...)):
+async def extract_pdf(files: list[UploadFile] = File(...), batch: bool = False):
     """
     Upload PDFs, extract tables using LandingAI, analyze with AI
+
+    With ?batch=true the AI analysis is submitted to the Message Batches API
+    instead; the response carries a batch_id to poll via /api/batch/{batch_id}.
     """
     temp_dir = tempfile.mkdtemp()
     pdf_paths = []
+    loop = asyncio.get_running_loop()
 
     try:
         # Save uploaded files
         for file in files:
             temp_path = Path(temp_dir) / file.filename
-            with open(temp_path, 'wb') as f:
-                content = await file.read()
-                f.write(content)
+            await loop.run_in_executor(EXECUTOR, save_upload, file.file, temp_path)
             pdf_paths.append(str(temp_path))
 
         # Run extraction pipeline (parallel processing inside)
-        results = process_multiple_pdfs(pdf_paths, base_output_dir="output", max_workers=3)
-
-        # Helper function to run analyzer in thread pool
-        def run_analyzer(output_dir: str):
-            """Blocking analyzer call - will be run in thread pool"""
-            analyzer = HybridTableAnalyzer(output_dir)
-            analysis_results = analyzer.analyze_all_tables()
-            analyzer.save_analysis(analysis_results)
+        results = await loop.run_in_executor(
+            EXECUTOR,
+            partial(process_multiple_pdfs, pdf_paths, base_output_dir="output")
+        )
+
+        # Helper coroutine to run one analyzer; file loading and saving go to
+        # threads so only the Claude calls run on the event loop
+        async def run_analyzer(output_dir: str):
+            """Async analyzer call - table requests run concurrently inside"""
+            analyzer = await asyncio.to_thread(HybridTableAnalyzer, output_dir)
+            analysis_results = await analyzer.analyze_all_tables()
+            await asyncio.to_thread(analyzer.save_analysis, analysis_results)
 
         # Run AI analysis in parallel for all non-cached results
-        to_analyze = [r for r in results if r['status'] == 'success' and not r.get('cached', False)]
+        to_analyze = [r for r in results if r.status == 'success' and not r.cached]
+        if to_analyze and batch:
+            print(f"\n📨 Submitting AI analysis of {len(to_analyze)} PDFs as a batch...")
+            analyzers = await asyncio.gather(*(
+                asyncio.to_thread(HybridTableAnalyzer, result.output_dir) for result in to_analyze
+            ))
+            batch_id = await submit_batch(analyzers, str(BATCH_MANIFEST_DIR))
+            return {"status": "success", "results": results, "batch_id": batch_id}
+
         if to_analyze:
             print(f"\n🔬 Running AI analysis on {len(to_analyze)} PDFs in parallel...")
-            loop = asyncio.get_event_loop()
             # Create tasks for all analyzers
-            tasks = [
-                loop.run_in_executor(None, run_analyzer, result['output_dir'])
-                for result in to_analyze
-            ]
+            tasks = [run_analyzer(result.output_dir) for result in to_analyze]
             # Wait for all to complete
             await asyncio.gather(*tasks)
 
         return {"status": "success", "results": results}
 
+    except HTTPException:
+        raise
+
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
@@ -78,8 +150,69 @@ async def extract_pdf(files: list[UploadFile] = File(...)):
         shutil.rmtree(temp_dir)
 
 # ============================================
-# ENDPOINT 2: List Extracted Data
+# ENDPOINT 2: Poll Batch Analysis
+# ============================================
+@app.get("/api/batch/{batch_id}")
+async def batch_status(batch_id: str):
+    """
+    Check a batch submitted by /api/extract-pdf?batch=true; once it has
+    ended, reassemble the results and save ai_analysis.json per PDF.
+    Collection happens once; later polls are answered from the manifest.
+    """
+    try:
+        output_dirs = load_batch_manifest(batch_id, str(BATCH_MANIFEST_DIR))
+    except FileNotFoundError:
+        raise HTTPException(status_code=404, detail=f"Unknown batch: {batch_id}")
+
+    try:
+        async with BATCH_LOCKS[batch_id]:
+            collected = load_batch_results(batch_id, str(BATCH_MANIFEST_DIR))
+            if collected is None:
+                status = await get_batch_status(batch_id)
+                if status.processing_status != "ended":
+                    return {
+                        "batch_id": batch_id,
+                        "status": status.processing_status,
+                        "request_counts": status.request_counts.model_dump()
+                    }
+
+                analyzers = await asyncio.gather(*(
+                    asyncio.to_thread(HybridTableAnalyzer, output_dir) for output_dir in output_dirs
+                ))
+                analyses = await collect_batch(batch_id, analyzers)
+                for analyzer in analyzers:
+                    await asyncio.to_thread(
+                        analyzer.save_analysis, analyses[str(analyzer.output_dir)]
+                    )
+
+                collected = [
+                    {"output_dir": output_dir, "table_count": len(analysis)}
+                    for output_dir, analysis in analyses.items()
+                ]
+                record_batch_results(batch_id, str(BATCH_MANIFEST_DIR), collected)
+
+        return {
+            "batch_id": batch_id,
+            "status": "ended",
+            "results": collected
+        }
+
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+# ============================================
+# ENDPOINT 3: List Extracted Data
 # ============================================
+@lru_cache(maxsize=1024)
+def count_analysis_tables(path: str, mtime: float, size: int) -> int:
+    """
+    Number of analyzed tables in an ai_analysis.json. Keyed on (mtime, size)
+    so polling only re-reads files that actually changed.
+    """
+    with open(path, 'rb') as f:
+        return len(orjson.loads(f.read()))
+
+
 @app.get("/api/list-extractions")
 async def list_extractions():
     """
@@ -93,16 +226,17 @@ async def list_extractions():
     for d in output_dir.iterdir():
         if d.is_dir():
             ai_json = d / "ai_analysis.json"
-            if ai_json.exists():
-                with open(ai_json, 'r') as f:
-                    analysis = json.load(f)
-
-                extractions.append({
-                    "name": d.name,
-                    "path": str(d),
-                    "table_count": len(analysis),
-                    "has_analysis": True
-                })
+            try:
+                st = ai_json.stat()
+            except FileNotFoundError:
+                continue
+
+            extractions.append({
+                "name": d.name,
+                "path": str(d),
+                "table_count": count_analysis_tables(str(ai_json), st.st_mtime, st.st_size),
+                "has_analysis": True
+            })
 
     return {"extractions": extractions}
 
@@ -6,7 +6,9 @@ Uses the official agentic-doc library.
 """
 
 import os
+import sys
 import json
+import logging
 from pathlib import Path
 from typing import List, Optional
 from dotenv import load_dotenv
@@ -22,6 +24,10 @@ except ImportError:
     print("Install it with: uv add agentic-doc")
     raise
 
+# Progress messages go through logging so callers running several extractions
+# on threads (multi_pdf_extract) get whole, non-interleaved lines
+logger = logging.getLogger(__name__)
+
 
 class ADETableExtractor:
     """Extract tables from PDFs using LandingAI ADE library."""
@@ -59,11 +65,11 @@ class ADETableExtractor:
                 }
                 tables.append(table_data)
 
-        print(f"\n✓ Found {len(tables)} table(s) out of {len(chunks)} total chunks")
+        logger.info(f"\n✓ Found {len(tables)} table(s) out of {len(chunks)} total chunks")
 
         for i, table in enumerate(tables, 1):
             page = table.get('page', 'unknown')
-            print(f"  Table {i}: Page {page}")
+            logger.info(f"  Table {i}: Page {page}")
 
         return tables
 
@@ -84,13 +90,13 @@ class ADETableExtractor:
         tables_file = output_path / f"{pdf_name}_tables.json"
         with open(tables_file, 'w', encoding='utf-8') as f:
             json.dump(tables, f, ensure_ascii=False, indent=2)
-        print(f"✓ Saved {len(tables)} tables to {tables_file}")
+        logger.info(f"✓ Saved {len(tables)} tables to {tables_file}")
 
         # Save full markdown
         markdown_file = output_path / f"{pdf_name}_full.md"
         with open(markdown_file, 'w', encoding='utf-8') as f:
             f.write(full_result.markdown)
-        print(f"✓ Saved full markdown to {markdown_file}")
+        logger.info(f"✓ Saved full markdown to {markdown_file}")
 
         # Save all chunks metadata
         all_chunks = []
@@ -105,7 +111,7 @@ class ADETableExtractor:
         chunks_file = output_path / f"{pdf_name}_all_chunks.json"
         with open(chunks_file, 'w', encoding='utf-8') as f:
             json.dump(all_chunks, f, ensure_ascii=False, indent=2)
-        print(f"✓ Saved all chunks metadata to {chunks_file}")
+        logger.info(f"✓ Saved all chunks metadata to {chunks_file}")
 
     def extract_from_pdf(self, pdf_path: str, output_dir: str = "output") -> List[dict]:
         """
@@ -122,8 +128,8 @@ class ADETableExtractor:
         if not pdf_path.exists():
             raise FileNotFoundError(f"PDF not found: {pdf_path}")
 
-        print(f"Processing {pdf_path.name} ({pdf_path.stat().st_size / 1024 / 1024:.2f} MB)...")
-        print("This may take a few minutes for large documents...\n")
+        logger.info(f"Processing {pdf_path.name} ({pdf_path.stat().st_size / 1024 / 1024:.2f} MB)...")
+        logger.info("This may take a few minutes for large documents...\n")
 
         # Parse the document using ADE
         results = parse(str(pdf_path))
@@ -134,6 +140,12 @@ class ADETableExtractor:
         # Get first result (single document)
         result = results[0]
 
+        # ADE reports failed pages in result.errors instead of raising
+        errors = getattr(result, 'errors', None)
+        if errors:
+            pages = sorted({e.page_num for e in errors})
+            raise RuntimeError(f"ADE parse failed on page(s) {pages}: {errors[0].error}")
+
         # Extract table chunks
         tables = self.extract_tables(result.chunks)
 
@@ -154,6 +166,7 @@ def main():
     parser.add_argument('--api-key', help='API key (default: from VISION_AGENT_API_KEY env var)')
 
     args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO, format='%(message)s', stream=sys.stdout)
 
     try:
         extractor = ADETableExtractor(api_key=args.api_key)
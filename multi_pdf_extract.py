@@ -4,17 +4,500 @@ Multi-PDF Table Extraction
 Process multiple financial statement PDFs in batch with parallel processing.
 """
 
+import os
+import json
 import sys
-from pathlib import Path
-from typing import List
-from concurrent.futures import ThreadPoolExecutor, as_completed
+import asyncio
+import threading
+import sqlite3
+import hashlib
+import logging
+import logging.handlers
+import multiprocessing
+import shutil
+import tempfile
+from dataclasses import dataclass
+from pathlib import Path, PurePosixPath
+from urllib.parse import urlsplit
+from typing import Callable, List, Optional, Tuple
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from pypdf import PdfReader, PdfWriter
 from extract_tables_ade import ADETableExtractor
 from parse_tables_from_markdown import MarkdownTableParser
 
+# Per-PDF progress goes through logging: parse workers push records onto a
+# queue and a single listener in the parent writes them, so lines from parallel
+# workers don't interleave mid-line or contend on stdout. ADE threads in the
+# parent (including extract_tables_ade's own progress) log straight to the
+# same handler. It is attached once here, never per batch, so concurrent
+# batches (e.g. parallel API uploads) can't detach each other's output.
+logger = logging.getLogger(__name__)
 
-def process_single_pdf(pdf_path: str, base_output_dir: str, index: int, total: int) -> dict:
+_console = logging.StreamHandler(sys.stdout)
+_console.setFormatter(logging.Formatter('%(message)s'))
+
+for _log in (logger, logging.getLogger('extract_tables_ade')):
+    _log.setLevel(logging.INFO)
+    _log.addHandler(_console)
+    _log.propagate = False
+
+@dataclass(slots=True)
+class PdfResult:
+    """Outcome of processing one PDF (status: 'success', 'error' or 'cancelled')."""
+    pdf_name: str
+    output_dir: str
+    num_tables: int
+    status: str
+    error: str = ""
+    cached: bool = False
+
+
+# One ADE client per process, shared by every ADE call that process makes
+_EXTRACTOR = None
+_EXTRACTOR_LOCK = threading.Lock()
+
+# Max ADE extractions in flight at once (I/O-bound, so independent of CPU count)
+ADE_CONCURRENCY = 8
+_ADE_SLOTS = threading.BoundedSemaphore(ADE_CONCURRENCY)
+
+# PDFs longer than this are extracted as parallel page-range parts
+SPLIT_PAGE_THRESHOLD = 64
+PAGES_PER_PART = 32
+
+
+def _get_extractor() -> ADETableExtractor:
+    """Return this process's ADETableExtractor, creating it on first use."""
+    global _EXTRACTOR
+    with _EXTRACTOR_LOCK:
+        if _EXTRACTOR is None:
+            _EXTRACTOR = ADETableExtractor()
+    return _EXTRACTOR
+
+
+def _init_worker(log_queue, worker_counter=None):
+    """
+    Parse-pool initializer: route logs to the parent's listener and (with
+    --pin-workers) pin the worker to the next CPU in its pool's range.
+    """
+    logger.handlers = [logging.handlers.QueueHandler(log_queue)]
+    logger.propagate = False
+
+    if worker_counter is not None:
+        with worker_counter.get_lock():
+            worker_id = worker_counter.value
+            worker_counter.value += 1
+        _pin_worker(worker_id)
+
+
+# Next CPU slot handed to a pinned pool; process-wide so concurrent batches
+# (e.g. parallel API uploads) spread over different CPUs instead of all using 0, 1, ...
+_next_pin_slot = 0
+_pin_slot_lock = threading.Lock()
+
+
+def _reserve_pin_slots(n: int) -> int:
+    """Reserve n consecutive CPU slots for one pool; returns the first."""
+    global _next_pin_slot
+    with _pin_slot_lock:
+        first = _next_pin_slot
+        _next_pin_slot += n
+    return first
+
+
+def _pin_worker(worker_id: int):
+    """
+    Pin this process to one CPU, round-robin over the CPUs it may run on.
+    worker_id is a slot from _reserve_pin_slots, not a per-pool index.
+
+    Keeps parse workers from being migrated between cores/sockets mid-parse.
+    Linux only; elsewhere (or if the kernel refuses) scheduling is left as is.
+    """
+    if not hasattr(os, 'sched_setaffinity'):
+        return
+    try:
+        cpus = sorted(os.sched_getaffinity(0))
+        os.sched_setaffinity(0, {cpus[worker_id % len(cpus)]})
+    except OSError:
+        pass
+
+
+def _run_ade(pdf_path: Path, output_dir: Path):
+    """
+    One ADE extraction, counted against ADE_CONCURRENCY across all threads.
+
+    No retry loop here: agentic_doc.parse already retries 408/429/5xx responses
+    with backoff (tune via its MAX_RETRIES / MAX_RETRY_WAIT_TIME settings);
+    pages that still fail make extract_from_pdf raise.
+    """
+    with _ADE_SLOTS:
+        _get_extractor().extract_from_pdf(str(pdf_path), output_dir=str(output_dir))
+
+
+def _plan_page_ranges(pdf_path: Path) -> Tuple[Optional[PdfReader], List[Tuple[int, int]]]:
+    """
+    Page ranges [start, end) to extract as separate parts.
+
+    Returns:
+        (reader, ranges): ~PAGES_PER_PART-page blocks and the open reader to cut
+        them from, for PDFs over SPLIT_PAGE_THRESHOLD pages; (None, []) to
+        extract the PDF whole
+    """
+    try:
+        reader = PdfReader(str(pdf_path))
+        num_pages = len(reader.pages)
+    except Exception:
+        # Unreadable for pypdf - give ADE the whole file and let it report any error
+        return None, []
+
+    if num_pages <= SPLIT_PAGE_THRESHOLD:
+        return None, []
+    return reader, [
+        (start, min(start + PAGES_PER_PART, num_pages))
+        for start in range(0, num_pages, PAGES_PER_PART)
+    ]
+
+
+def _write_part(reader: PdfReader, start: int, end: int, scratch: Path) -> Path:
+    """Write pages [start, end) as part.pdf in a fresh dir under scratch; returns that dir."""
+    part_dir = scratch / f"part_{start:05d}"
+    part_dir.mkdir()
+
+    writer = PdfWriter()
+    for page in reader.pages[start:end]:
+        writer.add_page(page)
+    with open(part_dir / "part.pdf", 'wb') as f:
+        writer.write(f)
+    return part_dir
+
+
+def _merge_parts(part_dirs: List[Path], offsets: List[int], output_dir: Path, pdf_name: str):
+    """
+    Combine per-part ADE outputs into the files a whole-PDF extraction writes.
+
+    Page numbers in the JSON outputs are shifted back to whole-document pages.
+    The markdown is written last, since the caller checks for it to confirm extraction succeeded.
+    """
+    markdown = []
+    merged = {"tables": [], "all_chunks": []}
+    for part_dir, offset in zip(part_dirs, offsets):
+        markdown.append((part_dir / "part_full.md").read_text(encoding='utf-8'))
+        for kind, items in merged.items():
+            with open(part_dir / f"part_{kind}.json", encoding='utf-8') as f:
+                for item in json.load(f):
+                    if isinstance(item.get('page'), int):
+                        item['page'] += offset
+                    items.append(item)
+
+    for kind, items in merged.items():
+        with open(output_dir / f"{pdf_name}_{kind}.json", 'w', encoding='utf-8') as f:
+            json.dump(items, f, ensure_ascii=False, indent=2)
+
+    with open(output_dir / f"{pdf_name}_full.md", 'w', encoding='utf-8') as f:
+        f.write("\n\n".join(markdown))
+
+
+def _extract_in_parts(reader: PdfReader, pdf_name: str, output_dir: Path,
+                      ranges: List[Tuple[int, int]]):
+    """
+    Extract a long PDF as page-range parts in parallel, then merge the results.
+
+    The part PDFs are all cut here from the one already-open reader; only the
+    ADE calls go to threads. Parts share _ADE_SLOTS with whole-PDF extractions,
+    so splitting never pushes concurrent ADE calls past ADE_CONCURRENCY.
+    """
+    scratch = Path(tempfile.mkdtemp(prefix="finforge_parts_"))
+    try:
+        part_dirs = [_write_part(reader, start, end, scratch) for start, end in ranges]
+        with ThreadPoolExecutor(max_workers=min(len(ranges), ADE_CONCURRENCY)) as parts:
+            list(parts.map(lambda part_dir: _run_ade(part_dir / "part.pdf", part_dir), part_dirs))
+        _merge_parts(part_dirs, [start for start, _ in ranges], output_dir, pdf_name)
+    finally:
+        shutil.rmtree(scratch, ignore_errors=True)
+
+
+def _count_table_csvs(output_dir: Path) -> int:
+    """Count existing table_*.csv files in one directory scan."""
+    with os.scandir(output_dir) as entries:
+        return sum(
+            1 for e in entries
+            if e.is_file() and e.name.startswith("table_") and e.name.endswith(".csv")
+        )
+
+
+# Inputs with these prefixes are fetched through fsspec instead of read from disk
+REMOTE_PREFIXES = ("s3://", "gs://", "gcs://", "http://", "https://")
+
+
+def _is_remote(pdf_path: str) -> bool:
+    """True if pdf_path is an fsspec URL rather than a local file."""
+    return pdf_path.startswith(REMOTE_PREFIXES)
+
+
+def _materialize_local(pdf_path: str) -> Path:
+    """
+    Download a remote PDF in one pass to a local scratch file.
+
+    ADE reading the URL directly turns into many small range requests; one bulk
+    GET is much faster. The file keeps its original name (ADE names its outputs
+    after it) inside a fresh temp dir - remove it with shutil.rmtree(path.parent).
+    """
+    try:
+        import fsspec
+    except ImportError:
+        print("ERROR: fsspec not installed (needed for remote PDF paths).")
+        print("Install it with: uv add fsspec")
+        raise
+
+    scratch = Path(tempfile.mkdtemp(prefix="finforge_pdf_"))
+    local_path = scratch / PurePosixPath(urlsplit(pdf_path).path).name
+    try:
+        with fsspec.open(pdf_path, "rb") as src, open(local_path, "wb") as dst:
+            shutil.copyfileobj(src, dst, 1024 * 1024)
+    except BaseException:
+        shutil.rmtree(scratch, ignore_errors=True)
+        raise
+    return local_path
+
+
+def _stat_ok(path: Path) -> bool:
+    """Existence check with a single stat() call."""
+    try:
+        path.stat()
+    except OSError:
+        return False
+    return True
+
+
+def _cached_result(pdf_path: Path, base_output_dir: str) -> Optional[PdfResult]:
+    """
+    Result for a PDF that was already processed (ai_analysis.json exists).
+
+    Returns:
+        PdfResult for this PDF, or None if the PDF still needs processing
     """
-    Process a single PDF file.
+    output_dir = Path(base_output_dir) / pdf_path.stem
+    if not _stat_ok(output_dir / "ai_analysis.json"):
+        return None
+
+    return PdfResult(
+        pdf_name=pdf_path.name,
+        output_dir=str(output_dir),
+        num_tables=_count_table_csvs(output_dir),
+        status='success',
+        cached=True
+    )
+
+
+# Bytes hashed from each end of a PDF for its manifest key
+FINGERPRINT_CHUNK = 1024 * 1024
+
+MANIFEST_NAME = ".manifest.sqlite"
+
+
+def _fingerprint(pdf_path: Path) -> bytes:
+    """
+    Content key for a PDF: blake2b of its size plus first and last 1 MiB.
+
+    Cheap regardless of file size, and stable across renames and re-sent copies.
+    """
+    h = hashlib.blake2b(digest_size=16)
+    with open(pdf_path, 'rb') as f:
+        size = os.fstat(f.fileno()).st_size
+        h.update(size.to_bytes(8, 'little'))
+        h.update(f.read(FINGERPRINT_CHUNK))
+        if size > FINGERPRINT_CHUNK:
+            f.seek(max(FINGERPRINT_CHUNK, size - FINGERPRINT_CHUNK))
+            h.update(f.read(FINGERPRINT_CHUNK))
+    return h.digest()
+
+
+def _open_manifest(base_output_dir: str) -> sqlite3.Connection:
+    """Open (creating if needed) the batch manifest mapping PDF fingerprint -> output dir."""
+    Path(base_output_dir).mkdir(parents=True, exist_ok=True)
+    conn = sqlite3.connect(str(Path(base_output_dir) / MANIFEST_NAME))
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("CREATE TABLE IF NOT EXISTS done(key BLOB PRIMARY KEY, out TEXT, n INT)")
+    return conn
+
+
+def _manifest_lookup(conn: sqlite3.Connection, key: bytes, pdf_path: Path) -> Optional[PdfResult]:
+    """
+    Cached result for a fingerprint recorded by an earlier run.
+
+    The entry only counts while its ai_analysis.json is still there, so a
+    deleted or not-yet-analyzed output dir falls through to a normal run.
+    """
+    row = conn.execute("SELECT out, n FROM done WHERE key = ?", (key,)).fetchone()
+    if row is None or not _stat_ok(Path(row[0]) / "ai_analysis.json"):
+        return None
+
+    return PdfResult(
+        pdf_name=pdf_path.name,
+        output_dir=row[0],
+        num_tables=row[1],
+        status='success',
+        cached=True
+    )
+
+
+def _manifest_has_output(conn: sqlite3.Connection, output_dir: str) -> bool:
+    """Whether some fingerprint is already recorded for this output dir."""
+    return conn.execute("SELECT 1 FROM done WHERE out = ? LIMIT 1", (output_dir,)).fetchone() is not None
+
+
+def _manifest_record(conn: sqlite3.Connection, key: bytes, result: PdfResult):
+    """Remember a successful result under the PDF's fingerprint."""
+    conn.execute(
+        "INSERT OR REPLACE INTO done(key, out, n) VALUES (?, ?, ?)",
+        (key, result.output_dir, result.num_tables)
+    )
+
+
+def _cancelled_result(pdf_name: str) -> PdfResult:
+    """Result for a PDF skipped because the batch was stopped (--stop-on-error)."""
+    return PdfResult(
+        pdf_name=pdf_name,
+        output_dir='',
+        num_tables=0,
+        status='cancelled',
+        error='Skipped - batch stopped after an earlier error'
+    )
+
+
+def _ade_stage(pdf_path: str, base_output_dir: str, index: int, total: int,
+               cancel_event=None) -> PdfResult:
+    """
+    Stage 1 (I/O-bound): resolve the cache and run ADE extraction if needed.
+
+    Args:
+        cancel_event: Batch cancel flag; once set, the PDF is skipped
+
+    Returns:
+        Finished PdfResult (cached or error), or one with status 'extracted'
+        whose markdown is ready for _parse_stage
+    """
+    source = str(pdf_path)
+    remote = _is_remote(source)
+    # For remote inputs this is only used for naming (pdf_name, output subdir)
+    pdf_path = Path(PurePosixPath(urlsplit(source).path).name) if remote else Path(source)
+
+    if cancel_event is not None and cancel_event.is_set():
+        return _cancelled_result(pdf_path.name)
+
+    if not remote and not _stat_ok(pdf_path):
+        logger.error(f"\n❌ File not found: {pdf_path}")
+        return PdfResult(
+            pdf_name=pdf_path.name,
+            output_dir='',
+            num_tables=0,
+            status='error',
+            error='File not found'
+        )
+
+    # Check if already processed (ai_analysis.json exists) before doing any other work
+    cached = _cached_result(pdf_path, base_output_dir)
+    if cached:
+        logger.info(f"\n✓ [{index}/{total}] {pdf_path.name}: already processed - using cached data")
+        return cached
+
+    output_dir = Path(base_output_dir) / pdf_path.stem
+
+    logger.info(f"\n{'='*60}")
+    logger.info(f"Processing PDF {index}/{total}: {pdf_path.name}")
+    logger.info(f"{'='*60}")
+
+    try:
+        # Step 1: Extract with ADE.
+        # Only a cache miss reaches here, so this is the one place that creates the output dir.
+        output_dir.mkdir(parents=True, exist_ok=True)
+        # Remote PDFs are only downloaded here, once we know ADE actually has to run
+        local_pdf = _materialize_local(source) if remote else pdf_path
+        try:
+            reader, ranges = _plan_page_ranges(local_pdf)
+            if ranges:
+                logger.info(f"\n[1/2] Running ADE extraction in {len(ranges)} page-range parts...")
+                _extract_in_parts(reader, pdf_path.stem, output_dir, ranges)
+            else:
+                logger.info(f"\n[1/2] Running ADE extraction...")
+                _run_ade(local_pdf, output_dir)
+        finally:
+            if remote:
+                shutil.rmtree(local_pdf.parent, ignore_errors=True)
+
+        markdown_file = output_dir / f"{pdf_path.stem}_full.md"
+        have_markdown = _stat_ok(markdown_file)
+
+        if not have_markdown:
+            return PdfResult(
+                pdf_name=pdf_path.name,
+                output_dir=str(output_dir),
+                num_tables=0,
+                status='error',
+                error='Markdown file not created',
+                cached=False
+            )
+
+        return PdfResult(
+            pdf_name=pdf_path.name,
+            output_dir=str(output_dir),
+            num_tables=0,
+            status='extracted'
+        )
+
+    except Exception as e:
+        logger.error(f"\n❌ Error processing {pdf_path.name}: {e}")
+        return PdfResult(
+            pdf_name=pdf_path.name,
+            output_dir=str(output_dir),
+            num_tables=0,
+            status='error',
+            error=str(e)
+        )
+
+
+def _parse_stage(extracted: PdfResult) -> PdfResult:
+    """
+    Stage 2 (CPU-bound): parse the ADE markdown into per-table CSVs.
+
+    Args:
+        extracted: Result of _ade_stage with status 'extracted'
+
+    Returns:
+        PdfResult for this PDF
+    """
+    pdf_name = extracted.pdf_name
+    output_dir = extracted.output_dir
+
+    logger.info(f"\n[2/2] Parsing HTML tables from markdown ({pdf_name})...")
+
+    try:
+        parser = MarkdownTableParser(str(Path(output_dir) / f"{Path(pdf_name).stem}_full.md"))
+        tables = parser.extract_tables()
+        parser.save_tables(tables, output_dir=output_dir)
+    except Exception as e:
+        logger.error(f"\n❌ Error processing {pdf_name}: {e}")
+        return PdfResult(
+            pdf_name=pdf_name,
+            output_dir=output_dir,
+            num_tables=0,
+            status='error',
+            error=str(e)
+        )
+
+    # DO NOT return large payloads here; persist to disk.
+    # This crosses the process boundary - tables and markdown stay in output_dir.
+    return PdfResult(
+        pdf_name=pdf_name,
+        output_dir=output_dir,
+        num_tables=len(tables),
+        status='success',
+        cached=False
+    )
+
+
+def process_single_pdf(pdf_path: str, base_output_dir: str, index: int, total: int) -> PdfResult:
+    """
+    Process a single PDF file (both stages, in the calling thread).
 
     Args:
         pdf_path: Path to PDF file
@@ -23,144 +506,225 @@ def process_single_pdf(pdf_path: str, base_output_dir: str, index: int, total: i
         total: Total number of PDFs
 
     Returns:
-        dict with processing result
+        PdfResult for this PDF
     """
-    extractor = ADETableExtractor()
-    pdf_path = Path(pdf_path)
+    result = _ade_stage(pdf_path, base_output_dir, index, total)
+    if result.status != 'extracted':
+        return result
+    return _parse_stage(result)
 
-    if not pdf_path.exists():
-        print(f"\n❌ File not found: {pdf_path}")
-        return {
-            'pdf_name': pdf_path.name,
-            'output_dir': '',
-            'num_tables': 0,
-            'status': 'error',
-            'error': 'File not found'
-        }
 
-    print(f"\n{'='*60}")
-    print(f"Processing PDF {index}/{total}: {pdf_path.name}")
-    print(f"{'='*60}")
+def _get_max_workers(n: int, cap: int = 16) -> int:
+    """
+    Size the worker pool from the batch size and CPU count.
 
-    try:
-        # Create output directory for this PDF
-        output_dir = Path(base_output_dir) / pdf_path.stem
-        output_dir.mkdir(parents=True, exist_ok=True)
+    Capped (default 16) because too many concurrent workers contend for CPU
+    and the ADE API instead of going faster.
+    """
+    return max(1, min(n, os.cpu_count() or 1, cap))
 
-        # Check if already processed (ai_analysis.json exists)
-        ai_analysis_file = output_dir / "ai_analysis.json"
-        if ai_analysis_file.exists():
-            print(f"\n✓ Already processed - using cached data")
-            print(f"  Found: {ai_analysis_file}")
-
-            # Count existing CSV tables
-            csv_files = list(output_dir.glob("table_*.csv"))
-
-            return {
-                'pdf_name': pdf_path.name,
-                'output_dir': str(output_dir),
-                'num_tables': len(csv_files),
-                'status': 'success',
-                'cached': True
-            }
-
-        # Step 1: Extract with ADE
-        print(f"\n[1/2] Running ADE extraction...")
-        extractor.extract_from_pdf(str(pdf_path), output_dir=str(output_dir))
-
-        # Step 2: Parse markdown tables
-        print(f"\n[2/2] Parsing HTML tables from markdown...")
-        markdown_file = output_dir / f"{pdf_path.stem}_full.md"
 
-        if markdown_file.exists():
-            parser = MarkdownTableParser(str(markdown_file))
-            tables = parser.extract_tables()
-            parser.save_tables(tables, output_dir=str(output_dir))
-
-            return {
-                'pdf_name': pdf_path.name,
-                'output_dir': str(output_dir),
-                'num_tables': len(tables),
-                'status': 'success',
-                'cached': False
-            }
-        else:
-            return {
-                'pdf_name': pdf_path.name,
-                'output_dir': str(output_dir),
-                'num_tables': 0,
-                'status': 'error',
-                'error': 'Markdown file not created',
-                'cached': False
-            }
+def _mp_context():
+    """
+    Multiprocessing context for the worker pool.
 
-    except Exception as e:
-        print(f"\n❌ Error processing {pdf_path.name}: {e}")
-        return {
-            'pdf_name': pdf_path.name,
-            'output_dir': str(output_dir) if 'output_dir' in locals() else '',
-            'num_tables': 0,
-            'status': 'error',
-            'error': str(e)
-        }
+    On Linux use forkserver: workers fork from a clean server process instead
+    of the (possibly threaded) parent. Elsewhere keep the platform default.
+    """
+    if sys.platform.startswith('linux'):
+        return multiprocessing.get_context('forkserver')
+    return multiprocessing.get_context()
 
 
-def process_multiple_pdfs(pdf_paths: List[str], base_output_dir: str = "output", max_workers: int = 3):
+def process_multiple_pdfs(pdf_paths: List[str], base_output_dir: str = "output", max_workers: Optional[int] = None,
+                          stop_on_error: bool = False, pin_workers: bool = False):
     """
     Process multiple PDF files in parallel and extract tables from each.
 
     Args:
         pdf_paths: List of paths to PDF files
         base_output_dir: Base directory for outputs (subdirectory per PDF)
-        max_workers: Maximum number of parallel workers (default: 3)
+        max_workers: Maximum number of parallel workers
+                     (default: sized from CPU count and number of PDFs)
+        stop_on_error: Skip all remaining PDFs after the first failure
+        pin_workers: Pin each parse worker to its own CPU (Linux only)
     """
-    print(f"\n🚀 Starting parallel processing of {len(pdf_paths)} PDFs with {max_workers} workers...")
-
     results = []
+    total = len(pdf_paths)
+
+    # Resolve already-processed PDFs here, so only real work is dispatched to workers.
+    # The manifest answers re-runs, renamed files and duplicate inputs with one
+    # indexed SELECT; the filesystem check covers outputs from before it existed.
+    manifest = _open_manifest(base_output_dir)
+    keys = {}
+    to_process = []
+    try:
+        with manifest:
+            for i, pdf_path in enumerate(pdf_paths, 1):
+                path = Path(pdf_path)
+                cached = None
+                if path.is_file():
+                    key = keys[pdf_path] = _fingerprint(path)
+                    cached = _manifest_lookup(manifest, key, path)
+                    if cached is None:
+                        cached = _cached_result(path, base_output_dir)
+                        # Name-based hits only seed the manifest for output dirs it has
+                        # never seen; if another fingerprint owns the dir, this file's
+                        # content differs from what produced it
+                        if cached and not _manifest_has_output(manifest, cached.output_dir):
+                            _manifest_record(manifest, key, cached)
+                if cached:
+                    logger.info(f"✓ [{i}/{total}] {cached.pdf_name}: already processed - using cached data")
+                    results.append(cached)
+                else:
+                    to_process.append((i, pdf_path))
+
+        def record(pdf_path: str, result: PdfResult):
+            # Committed per PDF, so an interrupted batch keeps what already succeeded
+            if result.status == 'success' and pdf_path in keys:
+                with manifest:
+                    _manifest_record(manifest, keys[pdf_path], result)
+
+        if to_process:
+            results.extend(_run_pdfs(to_process, base_output_dir, total, max_workers,
+                                     stop_on_error, pin_workers, on_result=record))
+    finally:
+        manifest.close()
+
+    return _print_batch_summary(results)
+
+
+def _run_pdfs(to_process: List[tuple], base_output_dir: str, total: int,
+              max_workers: Optional[int] = None, stop_on_error: bool = False,
+              pin_workers: bool = False,
+              on_result: Optional[Callable[[str, PdfResult], None]] = None) -> List[PdfResult]:
+    """
+    Run both processing stages over (index, path) pairs.
 
-    # Use ThreadPoolExecutor for parallel processing
-    with ThreadPoolExecutor(max_workers=max_workers) as executor:
-        # Submit all PDF processing tasks
-        future_to_pdf = {
-            executor.submit(process_single_pdf, pdf_path, base_output_dir, i, len(pdf_paths)): pdf_path
-            for i, pdf_path in enumerate(pdf_paths, 1)
-        }
-
-        # Collect results as they complete
-        for future in as_completed(future_to_pdf):
-            pdf_path = future_to_pdf[future]
-            try:
-                result = future.result()
-                results.append(result)
-            except Exception as e:
-                print(f"\n❌ Unexpected error processing {pdf_path}: {e}")
-                results.append({
-                    'pdf_name': Path(pdf_path).name,
-                    'output_dir': '',
-                    'num_tables': 0,
-                    'status': 'error',
-                    'error': str(e)
-                })
-
-    # Print summary
-    print(f"\n{'='*60}")
-    print(f"BATCH PROCESSING COMPLETE")
-    print(f"{'='*60}")
-
-    total_tables = sum(r['num_tables'] for r in results)
-    successful = sum(1 for r in results if r['status'] == 'success')
-
-    print(f"\nProcessed: {len(results)} PDFs")
-    print(f"Successful: {successful}/{len(results)}")
-    print(f"Total tables extracted: {total_tables}")
-
-    print(f"\nResults by file:")
+    on_result(pdf_path, result), if given, is called in this thread as each
+    PDF finishes.
+
+    Returns:
+        Results in the same order as to_process
+    """
+    if max_workers is None:
+        max_workers = _get_max_workers(len(to_process))
+
+    if len(to_process) == 1:
+        # Single PDF - no point paying for a worker pool
+        i, pdf_path = to_process[0]
+        print(f"\n🚀 Processing 1 PDF...")
+        result = process_single_pdf(pdf_path, base_output_dir, i, total)
+        if on_result:
+            on_result(pdf_path, result)
+        return [result]
+
+    print(f"\n🚀 Starting parallel processing of {len(to_process)} PDFs "
+          f"({ADE_CONCURRENCY} concurrent ADE calls, {max_workers} parse workers)...")
+
+    # ADE calls run on threads in this process; markdown parsing goes to a
+    # ProcessPoolExecutor (arguments are plain strings and results small PdfResults, so
+    # they pickle cheaply). Both log to the same console handler.
+    mp_context = _mp_context()
+    log_queue = mp_context.Queue()
+    cancel_event = threading.Event()
+    worker_counter = mp_context.Value('i', _reserve_pin_slots(max_workers)) if pin_workers else None
+    listener = logging.handlers.QueueListener(log_queue, _console)
+    listener.start()
+
+    pool = ProcessPoolExecutor(
+        max_workers=max_workers,
+        mp_context=mp_context,
+        initializer=_init_worker,
+        initargs=(log_queue, worker_counter)
+    )
+    try:
+        return asyncio.run(_pipeline(
+            to_process, base_output_dir, total, pool, stop_on_error, cancel_event, on_result
+        ))
+    except KeyboardInterrupt:
+        # Drop queued parse jobs instead of waiting for the whole batch to drain
+        print(f"\n⚠️  Interrupted - cancelling remaining PDFs...")
+        pool.shutdown(wait=False, cancel_futures=True)
+        raise
+    finally:
+        pool.shutdown(wait=True)
+        # Drain remaining worker logs before printing the summary
+        listener.stop()
+
+
+async def _pipeline(to_process: List[tuple], base_output_dir: str, total: int,
+                    pool: ProcessPoolExecutor, stop_on_error: bool,
+                    cancel_event, on_result=None) -> List[PdfResult]:
+    """
+    Run both stages for every PDF, overlapping ADE calls with parsing.
+
+    _ADE_SLOTS keeps at most ADE_CONCURRENCY extractions in flight; each PDF
+    moves on to the parse pool as soon as its markdown is ready, so cores stay
+    busy while the network works on the next PDF. With stop_on_error, the first failure sets
+    cancel_event and every PDF not yet started comes back 'cancelled'.
+
+    Returns:
+        Results in the same order as to_process
+    """
+    loop = asyncio.get_running_loop()
+    completed = 0
+
+    async def run_one(i: int, pdf_path: str) -> PdfResult:
+        nonlocal completed
+        try:
+            result = await asyncio.to_thread(
+                _ade_stage, pdf_path, base_output_dir, i, total, cancel_event
+            )
+            if result.status == 'extracted':
+                # Only the small PdfResult is pickled each way; the ADE client never leaves this process
+                result = await loop.run_in_executor(pool, _parse_stage, result)
+        except Exception as e:
+            logger.error(f"\n❌ Unexpected error processing {pdf_path}: {e}")
+            result = PdfResult(
+                pdf_name=Path(pdf_path).name,
+                output_dir='',
+                num_tables=0,
+                status='error',
+                error=str(e)
+            )
+
+        if on_result:
+            on_result(pdf_path, result)
+
+        if stop_on_error and result.status == 'error' and not cancel_event.is_set():
+            logger.warning(f"\n🛑 {result.pdf_name} failed - stopping batch (--stop-on-error)")
+            cancel_event.set()
+
+        completed += 1
+        logger.info(f"⏳ {completed}/{len(to_process)} done")
+        return result
+
+    return await asyncio.gather(*(run_one(i, pdf_path) for i, pdf_path in to_process))
+
+
+def _print_batch_summary(results: List[PdfResult]) -> List[PdfResult]:
+    """Print the batch summary (one buffered write) and return the results unchanged."""
+    total_tables = sum(r.num_tables for r in results)
+    successful = sum(1 for r in results if r.status == 'success')
+
+    lines = [
+        f"\n{'='*60}",
+        "BATCH PROCESSING COMPLETE",
+        f"{'='*60}",
+        f"\nProcessed: {len(results)} PDFs",
+        f"Successful: {successful}/{len(results)}",
+        f"Total tables extracted: {total_tables}",
+        f"\nResults by file:",
+    ]
     for result in results:
-        status_icon = "✅" if result['status'] == 'success' else "❌"
-        print(f"  {status_icon} {result['pdf_name']}: {result['num_tables']} tables")
-        if result['status'] == 'error':
-            print(f"      Error: {result.get('error', 'Unknown')}")
+        status_icon = {'success': "✅", 'cancelled': "⏭️ "}.get(result.status, "❌")
+        lines.append(f"  {status_icon} {result.pdf_name}: {result.num_tables} tables")
+        if result.status != 'success':
+            lines.append(f"      Error: {result.error or 'Unknown'}")
 
+    sys.stdout.write("\n".join(lines) + "\n")
+    sys.stdout.flush()
     return results
 
 
@@ -194,14 +758,36 @@ Examples:
         default='output',
         help='Base output directory (default: output)'
     )
+    parser.add_argument(
+        '--workers',
+        type=int,
+        default=None,
+        help='Number of parallel workers (default: based on CPU count, max 16)'
+    )
+    parser.add_argument(
+        '--stop-on-error',
+        action='store_true',
+        help='Skip remaining PDFs after the first failure'
+    )
+    parser.add_argument(
+        '--pin-workers',
+        action='store_true',
+        help='Pin each parse worker to its own CPU (Linux only)'
+    )
 
     args = parser.parse_args()
 
     # Process all PDFs
-    results = process_multiple_pdfs(args.pdf_files, args.output_dir)
+    results = process_multiple_pdfs(
+        args.pdf_files,
+        args.output_dir,
+        max_workers=args.workers,
+        stop_on_error=args.stop_on_error,
+        pin_workers=args.pin_workers
+    )
 
-    # Exit with error if any failed
-    if any(r['status'] == 'error' for r in results):
+    # Exit with error if any failed (or were skipped by --stop-on-error)
+    if any(r.status != 'success' for r in results):
         sys.exit(1)
 
 